@@ -1,20 +1,41 @@
+import importlib
 import os
+import re
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 import json
-# 加入作业提供的工具
-from .tools.fs import standard_fs_tools
-from .tools.todo import standard_todo_tools
-from .tools.server import standard_server_tools
-from .tools.supertest import standard_supertest_tools
-from .tools.playwright import standard_playwright_tools
 
+# orjson 是 C 扩展，解析/序列化 JSON 比标准库快数倍；未安装时回退到标准库
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 from .llm import LanguageModel, GeminiLanguageModel, MockLanguageModel
 from .tool import ToolRegistry
 from .history import HistoryEntry, SystemPrompt, UserInstruction, LLMResponse, ToolCallResult
 from .logger import Logger
 from .env import AgentEnvironment
 
+# 预编译标签匹配的正则，单次 C 级扫描即可提取内容；
+# DOTALL 让 JSON / 总结内容可以跨行，闭合的 </terminate> 标签可省略
+# 工具名前缀 -> (模块, 工厂函数)。工具模块按需延迟导入，
+# allowed_tools 没有用到的工具组就完全不用付导入开销
+_TOOL_GROUPS = {
+    "fs": (".tools.fs", "standard_fs_tools"),
+    "todo": (".tools.todo", "standard_todo_tools"),
+    "npm": (".tools.server", "standard_server_tools"),
+    "supertest": (".tools.supertest", "standard_supertest_tools"),
+    "playwright": (".tools.playwright", "standard_playwright_tools"),
+}
+
+# 标签和 JSON 之间允许出现空白（模型经常在标签后换行再写 JSON）
+_TOOL_CALL_RE = re.compile(r"<tool_call>\s*(\{.*?\})\s*</tool_call>", re.DOTALL)
+_TOOL_CALL_RE_B = re.compile(rb"<tool_call>\s*(\{.*?\})\s*</tool_call>", re.DOTALL)
+
+_TERMINATE_TAG = "<terminate>"
+_TERMINATE_END_TAG = "</terminate>"
+
 class Agent:
     working_dir: Path
     llm: LanguageModel
@@ -36,14 +57,18 @@ class Agent:
         self.history = []
         self.logger = None
         self.env = None
+        # 增量消息缓存：已经序列化过的历史条目不再重复调用 to_json()
+        self._messages_cache: List[Dict[str, Any]] = []
+        self._history_cursor: int = 0
 
     def initialize_environment(self):
-        config_path = self.working_dir / ".waa" / "config.json"
-        if not config_path.exists():
+        config_path = os.path.join(self.working_dir, ".waa", "config.json")
+        if not os.path.exists(config_path):
             raise FileNotFoundError(f"Config file not found: {config_path}")
 
-        with open(config_path, 'r') as f:
-            self.config = json.load(f)
+        # 二进制整读，跳过 TextIOWrapper 的编码探测，orjson 也能直接吃 bytes
+        with open(config_path, 'rb') as f:
+            self.config = _json_loads(f.read())
 
         self.env = AgentEnvironment(self.working_dir, self.config)
         self.max_turns = self.env.get_config_value("max_turns", 50)
@@ -77,18 +102,25 @@ class Agent:
         #########################################################
         # TODO: Load the tools into the tool registry           #
         #########################################################
-        # 将所有标准工具集合到一个列表里
-        all_tools = (
-            standard_fs_tools() +
-            standard_todo_tools() +
-            standard_server_tools() +
-            standard_supertest_tools() +
-            standard_playwright_tools()
-        )
+        # 配置里的允许列表是 JSON 数组，转成 frozenset 让成员判断变成 O(1)
+        allowed_set = None if allowed_tools is None else frozenset(allowed_tools)
+
+        # 根据工具名前缀判断需要哪些工具组，只导入用得到的模块
+        if allowed_set is None:
+            needed_groups = set(_TOOL_GROUPS)
+        else:
+            needed_groups = {name.split(".", 1)[0] for name in allowed_set}
+
+        all_tools = []
+        for group, (module_name, factory_name) in _TOOL_GROUPS.items():
+            if group not in needed_groups:
+                continue
+            module = importlib.import_module(module_name, package=__package__)
+            all_tools.extend(getattr(module, factory_name)())
 
         for tool in all_tools:
             # 如果 config.json 中没有限制 "allowed_tools"，或者当前工具在允许列表中
-            if allowed_tools is None or tool.name in allowed_tools:
+            if allowed_set is None or tool.name in allowed_set:
                 # 就注册这个工具
                 tool.initialize(self.env)
                 self.tool_registry.register_tool(tool)
@@ -111,22 +143,12 @@ class Agent:
             "\n# Available Tools"
         ]
 
-        # 2. 动态生成所有已注册工具的描述
-        all_tools = self.tool_registry.list_tools()
-        if not all_tools:
+        # 2. 取出注册表缓存的工具描述块（注册时已逐个格式化好）
+        tool_block = self.tool_registry.get_prompt_tool_block()
+        if not tool_block:
             prompt_parts.append("No tools are available.")
         else:
-            for tool in all_tools:
-                # 格式化每个工具的描述
-                arg_schemas = [
-                    f'"{arg.name}": "{arg.type.__name__}"' 
-                    for arg in tool.schema.arguments.values()
-                ]
-                tool_desc = (
-                    f"- {tool.name}: {tool.description()}\n"
-                    f"  Arguments: {{{', '.join(arg_schemas)}}}"
-                )
-                prompt_parts.append(tool_desc)
+            prompt_parts.append(tool_block)
 
         # 3. 将所有部分合并成一个最终的提示语字符串
         final_prompt = "\n".join(prompt_parts)
@@ -142,14 +164,14 @@ class Agent:
         # TODO: Load the user instruction in to the history     #
         #########################################################
         # 构建指令文件的固定路径
-        instruction_path = self.working_dir / ".waa" / "instruction.md"
-        
-        if not instruction_path.exists():
+        instruction_path = os.path.join(self.working_dir, ".waa", "instruction.md")
+
+        if not os.path.exists(instruction_path):
             raise FileNotFoundError(f"Instruction file not found at conventional path: {instruction_path}")
-        
-        # 读取文件内容
-        with open(instruction_path, 'r', encoding='utf-8') as f:
-            instruction_content = f.read()
+
+        # 读取文件内容（二进制整读后显式按 UTF-8 解码一次）
+        with open(instruction_path, 'rb') as f:
+            instruction_content = f.read().decode('utf-8')
 
         # 创建一个 UserInstruction 对象并添加到历史记录中
         user_instruction = UserInstruction(instruction_content)
@@ -172,7 +194,11 @@ class Agent:
         # TODO: Query the LLM                                   #
         #########################################################
         # 1. 将历史记录中的所有条目转换为 LLM 需要的字典格式
-        messages = [entry.to_json() for entry in self.history]
+        # 只序列化上一轮之后新增的条目，旧条目直接复用缓存（O(新增) 而非 O(全部历史)）
+        for entry in self.history[self._history_cursor:]:
+            self._messages_cache.append(entry.to_json())
+        self._history_cursor = len(self.history)
+        messages = self._messages_cache
 
         # 2. 调用 LLM 的 generate 方法
         self.logger.log("Querying LLM...")
@@ -228,16 +254,18 @@ class Agent:
         self.history.append(tool_result_entry)
 
     @staticmethod
-    def _parse_tool_call(response: str) -> Optional[Dict[str, Any]]:
-        if response.startswith("<tool_call>") and response.endswith("</tool_call>"):
-            # 提取标签中间的 JSON 字符串
-            json_str = response[len("<tool_call>"):-len("</tool_call>")]
-            try:
-                # 解析 JSON
-                return json.loads(json_str)
-            except json.JSONDecodeError:
-                return None
-        return None
+    def _parse_tool_call(response) -> Optional[Dict[str, Any]]:
+        # 用正则定位标签，LLM 输出前后夹杂空白或说明文字时也能识别；
+        # bytes 输入走 orjson 的原生快路径，省掉解析前的一次 UTF-8 编码
+        pattern = _TOOL_CALL_RE_B if isinstance(response, bytes) else _TOOL_CALL_RE
+        m = pattern.search(response)
+        if m is None:
+            return None
+        try:
+            # 解析 JSON（orjson 和标准库的解析错误都是 ValueError 的子类）
+            return _json_loads(m.group(1))
+        except ValueError:
+            return None
     
     def run(self):
         #########################################################
@@ -260,16 +288,21 @@ class Agent:
                     self.logger.log("LLM response was empty. Terminating.")
                     break
                 
-                # 2. 检查是否需要终止
-                if "<terminate>" in llm_response_content:
+                # 2. 检查是否需要终止：一次 find 同时给出判定结果和切片起点
+                idx = llm_response_content.find(_TERMINATE_TAG)
+                if idx >= 0:
                     self.logger.log("Agent decided to terminate.")
-                    # 可以在这里提取并记录最终答案
-                    final_answer = llm_response_content.replace("<terminate>", "").strip()
+                    # 只提取标签之间的最终答案（闭合标签可以省略）
+                    start = idx + len(_TERMINATE_TAG)
+                    end = llm_response_content.find(_TERMINATE_END_TAG, start)
+                    if end < 0:
+                        end = len(llm_response_content)
+                    final_answer = llm_response_content[start:end].strip()
                     self.logger.log(f"Final Answer: {final_answer}")
                     break
                 
-                # 3. 解析并执行工具调用
-                tool_call = self._parse_tool_call(llm_response_content)
+                # 3. 解析并执行工具调用（编码一次成 bytes，解析时不再复制字符串）
+                tool_call = self._parse_tool_call(llm_response_content.encode("utf-8"))
                 if tool_call:
                     self.execute_tool(tool_call)
                 else:
@@ -281,3 +314,5 @@ class Agent:
 
         finally:
             self.logger.log("Agent run finished.")
+            # 等待后台线程把剩余日志落盘
+            self.logger.close()
@@ -5,15 +5,19 @@ from datetime import datetime
 class HistoryEntry:
     def __init__(self, role: str):
         self.role = role
+        self._json_cache = None
 
     def get_content(self) -> Any:
         raise NotImplementedError("Subclasses must implement this method")
 
     def to_json(self) -> Dict[str, Any]:
-        return {
-            "role": self.role,
-            "content": self.get_content(),
-        }
+        # 历史条目构造之后不再变化，第一次序列化时缓存 JSON 形式
+        if self._json_cache is None:
+            self._json_cache = {
+                "role": self.role,
+                "content": self.get_content(),
+            }
+        return self._json_cache
 
 
 class SystemPrompt(HistoryEntry):
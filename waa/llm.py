@@ -21,6 +21,11 @@ class GeminiLanguageModel(LanguageModel):
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY environment variable not set")
 
+        # 持久的会话内容缓存：历史消息只翻译一次，
+        # 每轮只把新增的消息追加进来，避免 O(历史长度) 的重建
+        self._contents: List[Dict[str, Any]] = []
+        self._sent_prefix = 0
+
         try:
             import google.generativeai as genai
             genai.configure(api_key=self.api_key)
@@ -35,27 +40,52 @@ class GeminiLanguageModel(LanguageModel):
         except ImportError:
             raise ImportError("google-generativeai package not installed. Install with: pip install google-generativeai")
 
+    @staticmethod
+    def _to_gemini(msg: Dict[str, Any]) -> Dict[str, Any]:
+        """把单条 role/content 消息翻译成 Gemini 的 role/parts 格式。"""
+        # 已经是 Gemini 格式的消息原样使用
+        if "parts" in msg:
+            return msg
+
+        role = msg.get("role")
+        content = msg.get("content")
+
+        if role == "assistant":
+            return {"role": "model", "parts": [content]}
+        if role == "tool":
+            tool_content = content if isinstance(content, str) else str(content)
+            return {"role": "user", "parts": [f"Tool result: {tool_content}"]}
+        # system 和 user 都按 user 发送
+        return {"role": "user", "parts": [content]}
+
     def generate(self, messages: List[Dict[str, Any]]) -> str:
-        gemini_messages = []
-        for msg in messages:
-            role = msg.get("role")
-            content = msg.get("content")
-
-            if role == "system":
-                gemini_messages.append({"role": "user", "parts": [content]})
-            elif role == "user":
-                gemini_messages.append({"role": "user", "parts": [content]})
-            elif role == "assistant":
-                gemini_messages.append({"role": "model", "parts": [content]})
-            elif role == "tool":
-                tool_content = content if isinstance(content, str) else str(content)
-                gemini_messages.append({"role": "user", "parts": [f"Tool result: {tool_content}"]})
+        # 只翻译上次调用之后新增的消息并追加进持久缓存，
+        # 旧消息的角色映射和字典构造不再重复执行
+        for msg in messages[self._sent_prefix:]:
+            self._contents.append(self._to_gemini(msg))
+        self._sent_prefix = len(messages)
 
         try:
-            chat = self.client.start_chat(history=gemini_messages[:-1] if len(gemini_messages) > 1 else [])
-            response = chat.send_message(gemini_messages[-1]["parts"][0] if gemini_messages else "")
-            return response.text
+            # 流式接收：一旦闭合标签出现就提前返回，
+            # 不用等模型把 max_output_tokens 之内的尾部内容全部生成完
+            response = self.client.generate_content(self._contents, stream=True)
+            buf = []
+            text = ""
+            for chunk in response:
+                # 只带 finish_reason 或被安全过滤的块没有 parts，
+                # 此时访问 .text 会抛 ValueError，直接跳过
+                if not chunk.parts:
+                    continue
+                if chunk.text:
+                    buf.append(chunk.text)
+                    text = "".join(buf)
+                    if "</tool_call>" in text or "</terminate>" in text:
+                        break
+            return text
         except Exception as e:
+            # 缓存可能已与调用方的消息列表不同步，下次调用时从头重建
+            self._contents = []
+            self._sent_prefix = 0
             raise RuntimeError(f"Gemini API error: {str(e)}")
 
 
@@ -1,8 +1,13 @@
+import queue
+import threading
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Any, Optional
 import json
 
+# 投入队列表示"日志结束"的哨兵对象
+_SENTINEL = object()
+
 
 class Logger:
     def __init__(self, log_path: Path, debug: bool = False):
@@ -10,16 +15,38 @@ class Logger:
         self.log_path.parent.mkdir(parents=True, exist_ok=True)
         self.debug = debug
 
-        with open(self.log_path, 'w') as f:
-            f.write(f"=== WAA Agent Log ===\n")
-            f.write(f"Started: {datetime.now().isoformat()}\n")
-            f.write(f"{'=' * 80}\n\n")
+        # 写盘全部交给后台线程，主循环只负责格式化并塞进队列，
+        # 不会因为磁盘 I/O 阻塞在两次 LLM 调用之间
+        self._fh = open(self.log_path, 'w')
+        self._q = queue.SimpleQueue()
+        self._thr = threading.Thread(target=self._drain, daemon=True)
+        self._thr.start()
+
+        self._write(f"=== WAA Agent Log ===\n")
+        self._write(f"Started: {datetime.now().isoformat()}\n")
+        self._write(f"{'=' * 80}\n\n")
+
+    def _drain(self):
+        while True:
+            item = self._q.get()
+            if item is _SENTINEL:
+                self._fh.flush()
+                self._fh.close()
+                return
+            self._fh.write(item)
+
+    def _write(self, text: str):
+        self._q.put(text)
+
+    def close(self):
+        """写入剩余日志并停止后台线程，之后不能再记日志。"""
+        self._q.put(_SENTINEL)
+        self._thr.join()
 
     def log(self, message: str, level: str = "INFO"):
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         message = f"[{timestamp}] [{level}] {message}"
-        with open(self.log_path, 'a') as f:
-            f.write(f"{message}\n")
+        self._write(f"{message}\n")
         if self.debug:
             print(message)
 
@@ -27,8 +54,7 @@ class Logger:
         self.log("=" * 80, "INFO")
         self.log("SYSTEM PROMPT", "INFO")
         self.log("-" * 80, "INFO")
-        with open(self.log_path, 'a') as f:
-            f.write(f"{prompt}\n")
+        self._write(f"{prompt}\n")
         self.log("=" * 80, "INFO")
         self.log("", "INFO")
 
@@ -36,8 +62,7 @@ class Logger:
         self.log("=" * 80, "INFO")
         self.log("USER INSTRUCTION", "INFO")
         self.log("-" * 80, "INFO")
-        with open(self.log_path, 'a') as f:
-            f.write(f"{instruction}\n")
+        self._write(f"{instruction}\n")
         self.log("=" * 80, "INFO")
         self.log("", "INFO")
 
@@ -48,8 +73,7 @@ class Logger:
         self.log("-" * 80, "INFO")
         self.log(f"LLM RESPONSE (Turn {turn})", "INFO")
         self.log("-" * 80, "INFO")
-        with open(self.log_path, 'a') as f:
-            f.write(f"{response}\n")
+        self._write(f"{response}\n")
         self.log("-" * 80, "INFO")
         self.log("", "INFO")
 
@@ -22,20 +22,39 @@ class ToolSchema:
 
     def __init__(self):
         self.arguments = {}
+        self._checks = None
 
     def register_argument(self, argument: ToolArgument):
         self.arguments[argument.name] = argument
+        self._checks = None
+
+    def _compile(self):
+        # 把参数表压平成 (名称, 类型, 是否必填) 元组，
+        # 每次校验只走一个小循环，不再逐个参数做属性查找
+        self._checks = tuple(
+            (a.name, a.type, a.required) for a in self.arguments.values()
+        )
+        return self._checks
 
     def validate(self, input: Dict[str, ToolArgumentInput]) -> bool:
-        for argument in self.arguments.values():
-            if argument.name not in input and argument.required:
-                raise ValueError(f"Argument {argument.name} is required")
-            if argument.name in input and not argument.validate(input[argument.name]):
-                raise ValueError(f"Argument {argument.name} is invalid")
+        checks = self._checks
+        if checks is None:
+            checks = self._compile()
+        for name, expected_type, required in checks:
+            if name not in input:
+                if required:
+                    raise ValueError(f"Argument {name} is required")
+                continue
+            if expected_type is not None and type(input[name]) != expected_type:
+                raise ValueError(f"Argument {name} is invalid")
         return True
 
 
 class Tool:
+    # 用 __slots__ 省掉每个实例的 __dict__，属性访问也走更快的描述符路径；
+    # _desc_line 由 ToolRegistry 在注册时写入
+    __slots__ = ("name", "schema", "_desc_line")
+
     def __init__(self, name: str):
         self.name = name
         self.schema = ToolSchema()
@@ -55,12 +74,32 @@ class ToolRegistry:
 
     def __init__(self):
         self.tools = {}
+        self._prompt_block = None
 
     def register_tool(self, tool: Tool):
+        # 注册时就把该工具在系统提示语中的描述行固定下来，
+        # 之后重建提示语时只需拼接现成的字符串
+        arg_schemas = [
+            f'"{arg.name}": "{arg.type.__name__}"'
+            for arg in tool.schema.arguments.values()
+        ]
+        tool._desc_line = (
+            f"- {tool.name}: {tool.description()}\n"
+            f"  Arguments: {{{', '.join(arg_schemas)}}}"
+        )
         self.tools[tool.name] = tool
+        self._prompt_block = None
 
     def get_tool(self, name: str) -> Tool:
         return self.tools[name]
 
     def list_tools(self) -> List[Tool]:
         return list([tool for tool in self.tools.values()])
+
+    def get_prompt_tool_block(self) -> str:
+        """所有已注册工具的描述块，注册新工具时缓存自动失效。"""
+        if self._prompt_block is None:
+            self._prompt_block = "\n".join(
+                tool._desc_line for tool in self.tools.values()
+            )
+        return self._prompt_block
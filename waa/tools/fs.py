@@ -1,12 +1,92 @@
+import os
 import shutil
+import sys
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from ..tool import Tool, ToolArgument
 from ..env import AgentEnvironment
 
 
-class FileCreateTool(Tool):
+def _safe_join(wd_str: str, wd_prefix: str, path_str: str):
+    """把相对路径拼到工作目录下并做纯词法的越界检查。
+
+    只用 normpath 做字符串层面的归一化，不发起任何系统调用
+    （resolve() 会对每一级路径组件做 lstat）。越界时返回 None。
+    """
+    joined = os.path.normpath(os.path.join(wd_str, path_str))
+    if joined != wd_str and not joined.startswith(wd_prefix):
+        return None
+    return Path(joined)
+
+
+# 安全检查等高频错误信息的模板：只在出错时 format 一次路径，
+# 各工具共用同一份措辞
+_ERR_OUTSIDE = "Path is outside the working directory: {}"
+_ERR_PROTECTED = "File is protected and cannot be {}: {}"
+_ERR_FILE_NOT_FOUND = "File not found: {}"
+_ERR_NOT_A_FILE = "Path is not a file: {}"
+_ERR_DIR_NOT_FOUND = "Directory not found: {}"
+_ERR_NOT_A_DIR = "Path is not a directory: {}"
+
+# 树形输出用到的连接符/缩进常量；intern 之后相等比较退化成指针比较
+_BRANCH_LAST = sys.intern("└── ")
+_BRANCH_MID = sys.intern("├── ")
+_PAD_LAST = sys.intern("    ")
+_PAD_MID = sys.intern("│   ")
+
+
+class _FsToolBase(Tool):
+    """fs 工具的共享基类：统一初始化和入口处的安全检查。
+
+    各工具的 execute() 原本重复同一套"越界 → 受保护 → 存在性"分支，
+    现在收敛到 _guard() 一处，热路径只走一个紧凑的小函数。
+    """
+
+    __slots__ = ("working_dir", "protected_files", "_wd_resolved", "_wd_str", "_wd_prefix")
+
+    def initialize(self, env: AgentEnvironment):
+        self.working_dir = env.get_working_dir()
+        # 工作目录在 initialize 之后不会变化，resolve 一次后缓存，
+        # 后续路径检查只做字符串比较
+        self._wd_resolved = self.working_dir.resolve()
+        self._wd_str = str(self._wd_resolved)
+        self._wd_prefix = self._wd_str + os.sep
+        # 归一化后放进 frozenset：成员判断 O(1)，"./foo" 和 "foo" 视为同一文件
+        self.protected_files = frozenset(
+            os.path.normpath(p) for p in env.get_config_value("protected_files", [])
+        )
+
+    def _guard(
+        self,
+        path_str: str,
+        need_unprotected: Optional[str] = None,
+        need_file: bool = False,
+        need_dir: bool = False,
+    ) -> Tuple[Optional[Path], Optional[Dict[str, Any]]]:
+        """入口安全检查，成功返回 (路径, None)，失败返回 (None, 错误字典)。
+
+        need_unprotected 传入动词（如 "deleted"），既作为开关也用于
+        拼出受保护文件错误信息里的措辞。
+        """
+        full_path = _safe_join(self._wd_str, self._wd_prefix, path_str)
+        if full_path is None:
+            return None, {"ok": False, "error": _ERR_OUTSIDE.format(path_str)}
+        if need_unprotected and os.path.normpath(path_str) in self.protected_files:
+            return None, {"ok": False, "error": _ERR_PROTECTED.format(need_unprotected, path_str)}
+        # 正常情况下 is_file/is_dir 一次 stat 就通过，只有出错时才多查一次 exists
+        if need_file and not full_path.is_file():
+            template = _ERR_NOT_A_FILE if full_path.exists() else _ERR_FILE_NOT_FOUND
+            return None, {"ok": False, "error": template.format(path_str)}
+        if need_dir and not full_path.is_dir():
+            template = _ERR_NOT_A_DIR if full_path.exists() else _ERR_DIR_NOT_FOUND
+            return None, {"ok": False, "error": template.format(path_str)}
+        return full_path, None
+
+
+class FileCreateTool(_FsToolBase):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__("fs.write")
         # 1. 定义工具参数：path 和 content
@@ -17,36 +97,35 @@ class FileCreateTool(Tool):
             ToolArgument("content", "The content to write to the file.", True, str)
         )
 
-    def initialize(self, env: AgentEnvironment):
-        # 2. 初始化安全检查所需的环境变量
-        self.working_dir = env.get_working_dir()
-        self.protected_files = env.get_config_value("protected_files", [])
-
     def description(self) -> str:
-        # 3. 提供工具描述
+        # 2. 提供工具描述
         return "Creates or overwrites a file with specified content. Creates parent directories if needed."
 
     def execute(self, input: Dict[str, Any]) -> Dict[str, Any]:
-        # 4. 执行核心逻辑
+        # 3. 执行核心逻辑
         path_str = input["path"]
         content = input["content"]
 
         try:
-            full_path = (self.working_dir / path_str).resolve()
-
-            # --- 安全检查 1: 路径验证 ---
-            if not str(full_path).startswith(str(self.working_dir.resolve())):
-                return {"ok": False, "error": f"Path is outside the working directory: {path_str}"}
-
-            # --- 安全检查 2: 受保护文件检查 ---
-            if path_str in self.protected_files:
-                return {"ok": False, "error": f"File is protected and cannot be written to: {path_str}"}
+            # --- 安全检查：越界 + 受保护文件 ---
+            full_path, err = self._guard(path_str, need_unprotected="written to")
+            if err:
+                return err
 
             # 确保父目录存在，如果不存在则创建
             full_path.parent.mkdir(parents=True, exist_ok=True)
 
-            # 写入文件内容
-            full_path.write_text(content, encoding='utf-8')
+            # 先写进带 pid 的临时文件再原子替换：写到一半崩溃不会留下
+            # 截断的目标文件，读者要么看到旧内容要么看到完整的新内容
+            tmp_path = f"{full_path}.tmp.{os.getpid()}"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                os.replace(tmp_path, full_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
 
             return {
                 "ok": True,
@@ -56,7 +135,9 @@ class FileCreateTool(Tool):
             return {"ok": False, "error": f"Failed to write file: {str(e)}"}
 
 
-class FileDeleteTool(Tool):
+class FileDeleteTool(_FsToolBase):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__("fs.delete")
         # 1. 定义工具参数：path
@@ -64,32 +145,22 @@ class FileDeleteTool(Tool):
             ToolArgument("path", "The path of the file to delete.", True, str)
         )
 
-    def initialize(self, env: AgentEnvironment):
-        # 2. 初始化安全检查所需的环境变量
-        self.working_dir = env.get_working_dir()
-        self.protected_files = env.get_config_value("protected_files", [])
-
     def description(self) -> str:
-        # 3. 提供工具描述
+        # 2. 提供工具描述
         return "Deletes a specified file."
 
     def execute(self, input: Dict[str, Any]) -> Dict[str, Any]:
-        # 4. 执行核心逻辑
+        # 3. 执行核心逻辑
         path_str = input["path"]
 
         try:
-            full_path = (self.working_dir / path_str).resolve()
-
-            # --- 安全检查 1: 路径验证 ---
-            if not str(full_path).startswith(str(self.working_dir.resolve())):
-                return {"ok": False, "error": f"Path is outside the working directory: {path_str}"}
-
-            # --- 安全检查 2: 受保护文件检查 ---
-            if path_str in self.protected_files:
-                return {"ok": False, "error": f"File is protected and cannot be deleted: {path_str}"}
+            # --- 安全检查：越界 + 受保护文件 ---
+            full_path, err = self._guard(path_str, need_unprotected="deleted")
+            if err:
+                return err
 
             if not full_path.exists():
-                return {"ok": False, "error": f"File not found: {path_str}"}
+                return {"ok": False, "error": _ERR_FILE_NOT_FOUND.format(path_str)}
             if not full_path.is_file():
                 return {"ok": False, "error": f"Path is not a file, cannot be deleted with fs.delete: {path_str}"}
 
@@ -104,7 +175,9 @@ class FileDeleteTool(Tool):
             return {"ok": False, "error": f"Failed to delete file: {str(e)}"}
 
 
-class FileReadTool(Tool):
+class FileReadTool(_FsToolBase):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__("fs.read")
         # 1. 定义工具的参数 (Schema)
@@ -112,36 +185,41 @@ class FileReadTool(Tool):
             ToolArgument("path", "The path to the file to read.", True, str)
         )
 
-    def initialize(self, env: AgentEnvironment):
-        # 2. 从环境中获取必要的信息以备后用
-        self.working_dir = env.get_working_dir()
-        # 虽然 fs.read 不需要检查受保护文件，但好习惯是在此初始化
-        self.protected_files = env.get_config_value("protected_files", [])
-
     def description(self) -> str:
-        # 3. 提供给 LLM 的工具描述
+        # 2. 提供给 LLM 的工具描述
         return "Reads the content of a file. Returns the content, size, and line count."
 
     def execute(self, input: Dict[str, Any]) -> Dict[str, Any]:
-        # 4. 执行工具的核心逻辑
+        # 3. 执行工具的核心逻辑
         path_str = input["path"]
-        
-        try:
-            full_path = (self.working_dir / path_str).resolve()
-
-            # --- 安全检查 1: 路径验证 ---
-            if not str(full_path).startswith(str(self.working_dir.resolve())):
-                return {"ok": False, "error": f"Path is outside the working directory: {path_str}"}
 
-            if not full_path.exists():
-                return {"ok": False, "error": f"File not found: {path_str}"}
-            if not full_path.is_file():
-                return {"ok": False, "error": f"Path is not a file: {path_str}"}
-            
-            # 读取文件内容和元数据
-            content = full_path.read_text(encoding='utf-8')
-            size = full_path.stat().st_size
-            line_count = len(content.splitlines())
+        try:
+            # --- 安全检查：越界 + 必须是已存在的文件 ---
+            full_path, err = self._guard(path_str, need_file=True)
+            if err:
+                return err
+
+            # 裸 fd 整读：绕过 BufferedReader/TextIOWrapper 的一层缓冲拷贝，
+            # 大小来自已打开 fd 的 fstat（比按路径 stat 少一次路径解析），
+            # 行数用 count 统计而不是 splitlines 建整张列表
+            fd = os.open(full_path, os.O_RDONLY)
+            try:
+                size = os.fstat(fd).st_size
+                # os.read 允许短读（Linux 单次最多约 2 GiB），
+                # 循环补读直到拿满 fstat 给出的字节数
+                chunks = []
+                remaining = size
+                while remaining > 0:
+                    chunk = os.read(fd, min(remaining, 1 << 30))
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                    remaining -= len(chunk)
+                raw = chunks[0] if len(chunks) == 1 else b''.join(chunks)
+            finally:
+                os.close(fd)
+            content = raw.decode('utf-8')
+            line_count = content.count('\n') + (1 if content and not content.endswith('\n') else 0)
 
             return {
                 "ok": True,
@@ -155,7 +233,9 @@ class FileReadTool(Tool):
         except Exception as e:
             return {"ok": False, "error": f"Failed to read file: {str(e)}"}
 
-class FileEditTool(Tool):
+class FileEditTool(_FsToolBase):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__("fs.edit")
         # 1. 定义工具参数
@@ -169,47 +249,70 @@ class FileEditTool(Tool):
             ToolArgument("new_text", "The new text to replace the old_text with.", True, str)
         )
 
-    def initialize(self, env: AgentEnvironment):
-        # 2. 初始化安全检查所需的环境变量
-        self.working_dir = env.get_working_dir()
-        self.protected_files = env.get_config_value("protected_files", [])
-
     def description(self) -> str:
-        # 3. 提供工具描述
+        # 2. 提供工具描述
         return "Edits a file by replacing the first occurrence of old_text with new_text."
 
     def execute(self, input: Dict[str, Any]) -> Dict[str, Any]:
-        # 4. 执行核心逻辑
+        # 3. 执行核心逻辑
         path_str = input["path"]
         old_text = input["old_text"]
         new_text = input["new_text"]
 
         try:
-            full_path = (self.working_dir / path_str).resolve()
-
-            # --- 安全检查 1: 路径验证 ---
-            if not str(full_path).startswith(str(self.working_dir.resolve())):
-                return {"ok": False, "error": f"Path is outside the working directory: {path_str}"}
-
-            # --- 安全检查 2: 受保护文件检查 ---
-            if path_str in self.protected_files:
-                return {"ok": False, "error": f"File is protected and cannot be edited: {path_str}"}
-            
-            if not full_path.is_file():
-                return {"ok": False, "error": f"File not found: {path_str}"}
-
-            # 读取文件内容
-            content = full_path.read_text(encoding='utf-8')
-
-            # 使用 .replace(..., ..., 1) 只替换第一次出现的内容
-            new_content = content.replace(old_text, new_text, 1)
-
-            # 检查内容是否真的被改变了
-            if content == new_content:
-                return {"ok": False, "error": f"Text to be replaced ('{old_text}') not found in file: {path_str}"}
-
-            # 将修改后的内容写回文件
-            full_path.write_text(new_content, encoding='utf-8')
+            # --- 安全检查：越界 + 受保护文件 + 必须是已存在的文件 ---
+            full_path, err = self._guard(path_str, need_unprotected="edited", need_file=True)
+            if err:
+                return err
+
+            # 分块流式替换：按 1 MiB 读入并直接把命中前的内容写进临时文件，
+            # 旧内容和新内容从不整份同时驻留内存；块尾保留 len(needle)-1 字节，
+            # 目标串正好横跨两个块时也能命中
+            needle = old_text.encode('utf-8')
+            keep = max(len(needle) - 1, 0)
+            # 带 pid 的临时名，避免覆盖/误删工作区里恰好叫 <file>.tmp 的文件
+            tmp_path = f"{full_path}.tmp.{os.getpid()}"
+            found = False
+            try:
+                with open(full_path, 'rb') as rf, open(tmp_path, 'wb') as wf:
+                    buf = b''
+                    while True:
+                        chunk = rf.read(1 << 20)
+                        if not chunk:
+                            break
+                        buf += chunk
+                        idx = buf.find(needle)
+                        if idx != -1:
+                            wf.write(buf[:idx])
+                            wf.write(new_text.encode('utf-8'))
+                            wf.write(buf[idx + len(needle):])
+                            shutil.copyfileobj(rf, wf, 1 << 20)
+                            found = True
+                            break
+                        if keep:
+                            wf.write(buf[:-keep])
+                            buf = buf[-keep:]
+                        else:
+                            wf.write(buf)
+                            buf = b''
+                    if not found and buf:
+                        # 读完仍未命中，补写保留的块尾
+                        wf.write(buf)
+                    if not found and not needle:
+                        # 空 old_text 等价于在文件开头插入（与 replace 的语义一致）
+                        wf.write(new_text.encode('utf-8'))
+                        found = True
+
+                if not found:
+                    os.unlink(tmp_path)
+                    return {"ok": False, "error": f"Text to be replaced ('{old_text}') not found in file: {path_str}"}
+
+                # 原子替换，写一半时崩溃不会留下损坏的目标文件
+                os.replace(tmp_path, full_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
 
             return {
                 "ok": True,
@@ -219,7 +322,9 @@ class FileEditTool(Tool):
             return {"ok": False, "error": f"Failed to edit file: {str(e)}"}
 
 
-class DirectoryCreateTool(Tool):
+class DirectoryCreateTool(_FsToolBase):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__("fs.mkdir")
         # 1. 定义工具参数：path
@@ -227,24 +332,19 @@ class DirectoryCreateTool(Tool):
             ToolArgument("path", "The path of the directory to create.", True, str)
         )
 
-    def initialize(self, env: AgentEnvironment):
-        # 2. 初始化安全检查所需的环境变量
-        self.working_dir = env.get_working_dir()
-
     def description(self) -> str:
-        # 3. 提供工具描述
+        # 2. 提供工具描述
         return "Creates a new directory. It will also create parent directories if they do not exist."
 
     def execute(self, input: Dict[str, Any]) -> Dict[str, Any]:
-        # 4. 执行核心逻辑
+        # 3. 执行核心逻辑
         path_str = input["path"]
 
         try:
-            full_path = (self.working_dir / path_str).resolve()
-
-            # --- 安全检查 1: 路径验证 ---
-            if not str(full_path).startswith(str(self.working_dir.resolve())):
-                return {"ok": False, "error": f"Path is outside the working directory: {path_str}"}
+            # --- 安全检查：越界 ---
+            full_path, err = self._guard(path_str)
+            if err:
+                return err
 
             # 创建目录，parents=True 会自动创建父目录, exist_ok=True 意味着如果目录已存在也不会报错
             full_path.mkdir(parents=True, exist_ok=True)
@@ -257,7 +357,9 @@ class DirectoryCreateTool(Tool):
             return {"ok": False, "error": f"Failed to create directory: {str(e)}"}
 
 
-class DirectoryDeleteTool(Tool):
+class DirectoryDeleteTool(_FsToolBase):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__("fs.rmdir")
         # 1. 定义工具参数：path 和可选的 recursive
@@ -268,35 +370,25 @@ class DirectoryDeleteTool(Tool):
             ToolArgument("recursive", "If true, deletes directory and all its contents.", False, bool)
         )
 
-    def initialize(self, env: AgentEnvironment):
-        # 2. 初始化安全检查所需的环境变量
-        self.working_dir = env.get_working_dir()
-
     def description(self) -> str:
-        # 3. 提供工具描述
+        # 2. 提供工具描述
         return "Deletes a directory. Use the 'recursive' argument (boolean) to delete non-empty directories."
 
     def execute(self, input: Dict[str, Any]) -> Dict[str, Any]:
-        # 4. 执行核心逻辑
+        # 3. 执行核心逻辑
         path_str = input["path"]
         # 使用 .get() 为 recursive 参数提供默认值 False
         recursive = input.get("recursive", False)
 
         try:
-            full_path = (self.working_dir / path_str).resolve()
-
-            # --- 安全检查 1: 路径验证 ---
-            if not str(full_path).startswith(str(self.working_dir.resolve())):
-                return {"ok": False, "error": f"Path is outside the working directory: {path_str}"}
-            
-            # --- 安全检查 2: 防止删除工作目录本身 ---
-            if full_path == self.working_dir.resolve():
-                return {"ok": False, "error": "Cannot delete the root working directory."}
+            # --- 安全检查：越界 + 必须是已存在的目录 ---
+            full_path, err = self._guard(path_str, need_dir=True)
+            if err:
+                return err
 
-            if not full_path.exists():
-                return {"ok": False, "error": f"Directory not found: {path_str}"}
-            if not full_path.is_dir():
-                return {"ok": False, "error": f"Path is not a directory: {path_str}"}
+            # --- 防止删除工作目录本身 ---
+            if full_path == self._wd_resolved:
+                return {"ok": False, "error": "Cannot delete the root working directory."}
 
             if recursive:
                 # 递归删除整个目录树
@@ -308,7 +400,7 @@ class DirectoryDeleteTool(Tool):
                 message = f"Successfully deleted empty directory {path_str}."
 
             return {"ok": True, "data": {"message": message}}
-        
+
         except OSError:
              # 如果非递归删除时目录不为空，会触发 OSError
             return {"ok": False, "error": f"Directory not empty. Use recursive=True to delete it: {path_str}"}
@@ -316,7 +408,9 @@ class DirectoryDeleteTool(Tool):
             return {"ok": False, "error": f"Failed to delete directory: {str(e)}"}
 
 
-class DirectoryListTool(Tool):
+class DirectoryListTool(_FsToolBase):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__("fs.ls")
         # 1. 定义工具参数：path
@@ -324,42 +418,36 @@ class DirectoryListTool(Tool):
             ToolArgument("path", "The path of the directory to list.", True, str)
         )
 
-    def initialize(self, env: AgentEnvironment):
-        # 2. 初始化安全检查所需的环境变量
-        self.working_dir = env.get_working_dir()
-
     def description(self) -> str:
-        # 3. 提供工具描述
+        # 2. 提供工具描述
         return "Lists contents of a directory, showing name, type ('file' or 'dir'), and size for each entry."
 
     def execute(self, input: Dict[str, Any]) -> Dict[str, Any]:
-        # 4. 执行核心逻辑
+        # 3. 执行核心逻辑
         path_str = input["path"]
 
         try:
-            full_path = (self.working_dir / path_str).resolve()
-
-            # --- 安全检查 1: 路径验证 ---
-            if not str(full_path).startswith(str(self.working_dir.resolve())):
-                return {"ok": False, "error": f"Path is outside the working directory: {path_str}"}
-
-            if not full_path.is_dir():
-                return {"ok": False, "error": f"Path is not a directory: {path_str}"}
+            # --- 安全检查：越界 + 必须是已存在的目录 ---
+            full_path, err = self._guard(path_str, need_dir=True)
+            if err:
+                return err
 
             entries = []
-            # 遍历目录中的每一个项目
-            for item in full_path.iterdir():
-                # 判断是文件还是目录
-                item_type = "dir" if item.is_dir() else "file"
-                # 获取大小
-                item_size = item.stat().st_size
-                
-                # 按照要求格式添加信息到列表
-                entries.append({
-                    "name": item.name,
-                    "type": item_type,
-                    "size": item_size,
-                })
+            # 用 scandir 遍历：DirEntry 直接带出类型和 stat 信息，
+            # 每个条目最多一次系统调用，而不是 is_dir + stat 各一次
+            with os.scandir(full_path) as it:
+                for item in it:
+                    # 判断是文件还是目录
+                    item_type = "dir" if item.is_dir(follow_symlinks=False) else "file"
+                    # 获取大小
+                    item_size = item.stat(follow_symlinks=False).st_size
+
+                    # 按照要求格式添加信息到列表
+                    entries.append({
+                        "name": item.name,
+                        "type": item_type,
+                        "size": item_size,
+                    })
 
             return {
                 "ok": True,
@@ -369,46 +457,56 @@ class DirectoryListTool(Tool):
             return {"ok": False, "error": f"Failed to list directory contents: {str(e)}"}
 
 
-class DirectoryTreeTool(Tool):
+class DirectoryTreeTool(_FsToolBase):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__("fs.tree")
         self.schema.register_argument(
             ToolArgument("path", "The path of the directory to display as a tree.", False, str)
         )
 
-    def initialize(self, env: AgentEnvironment):
-        self.working_dir = env.get_working_dir()
-
     def description(self) -> str:
         return "Displays the directory structure as a tree, starting from the given path or current directory."
 
-    def _build_tree(self, directory: Path, prefix: str = "") -> List[str]:
-        """Helper function to recursively build the tree string."""
-        tree_lines = []
-        # .iterdir() returns an unsorted iterator, so we sort it to have a consistent output
-        items = sorted(list(directory.iterdir()), key=lambda p: p.name.lower())
-        for i, item in enumerate(items):
-            is_last = i == (len(items) - 1)
-            connector = "└── " if is_last else "├── "
-            tree_lines.append(f"{prefix}{connector}{item.name}")
-            
-            if item.is_dir():
-                new_prefix = prefix + ("    " if is_last else "│   ")
-                tree_lines.extend(self._build_tree(item, new_prefix))
+    def _build_tree(self, directory) -> List[str]:
+        """Helper function to build the tree lines with an explicit stack."""
+        # 迭代式先序遍历：所有行都直接写进同一个累加列表，
+        # 不再为每层递归分配中间列表再 extend 回去。
+        # 栈里要么是待输出的行（str），要么是待展开的 (目录, 前缀)；
+        # 条目反向压栈保证弹出顺序与递归版一致
+        tree_lines: List[str] = []
+        stack = [(directory, "")]
+        while stack:
+            task = stack.pop()
+            if isinstance(task, str):
+                tree_lines.append(task)
+                continue
+            current_dir, prefix = task
+            # scandir 返回的 DirEntry 自带类型信息，判断目录通常不需要额外 stat；
+            # 迭代器无序，排序以保证输出稳定
+            with os.scandir(current_dir) as it:
+                items = sorted(it, key=lambda e: e.name.lower())
+            last = len(items) - 1
+            for i in range(last, -1, -1):
+                item = items[i]
+                is_last = i == last
+                connector = _BRANCH_LAST if is_last else _BRANCH_MID
+                if item.is_dir(follow_symlinks=False):
+                    stack.append((item.path, prefix + (_PAD_LAST if is_last else _PAD_MID)))
+                # join 可以预先算好总长度，一次分配拼出整行
+                stack.append("".join((prefix, connector, item.name)))
         return tree_lines
 
     def execute(self, input: Dict[str, Any]) -> Dict[str, Any]:
         path_str = input.get("path", ".")
 
         try:
-            full_path = (self.working_dir / path_str).resolve()
-
-            if not str(full_path).startswith(str(self.working_dir.resolve())):
-                return {"ok": False, "error": f"Path is outside the working directory: {path_str}"}
+            # --- 安全检查：越界 + 必须是已存在的目录 ---
+            full_path, err = self._guard(path_str, need_dir=True)
+            if err:
+                return err
 
-            if not full_path.is_dir():
-                return {"ok": False, "error": f"Path is not a directory: {path_str}"}
-            
             tree_lines = [path_str] + self._build_tree(full_path)
 
             return {
@@ -430,4 +528,4 @@ def standard_fs_tools() -> List[Tool]:
         DirectoryDeleteTool(),
         DirectoryListTool(),
         DirectoryTreeTool()
-    ]
\ No newline at end of file
+    ]
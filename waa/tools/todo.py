@@ -1,4 +1,5 @@
 import json
+import os
 from pathlib import Path
 from typing import Dict, Any, List
 from datetime import datetime
@@ -6,12 +7,114 @@ from datetime import datetime
 from ..tool import Tool, ToolArgument
 from ..env import AgentEnvironment
 
+# orjson 是 C 扩展，序列化/解析都比标准库快数倍；未安装时回退到标准库
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    _loads = orjson.loads
+except ImportError:
+    # 复用同一个编码器实例：json.dumps 每次调用都会新建一个
+    # JSONEncoder 并重新处理参数，这里把这份构造成本只付一次
+    _ENCODER = json.JSONEncoder(indent=2, ensure_ascii=False)
+
+    def _dumps(obj) -> bytes:
+        return _ENCODER.encode(obj).encode('utf-8')
+
+    _loads = json.loads
+
 
 # 定义一个常量，方便在多个工具中引用
 TODO_FILE = ".waa/todo.json"
 
+class _TodoStore:
+    """同一个 todo 文件的共享存取层。
+
+    内存里按 id 建立字典索引（Python 3.7+ 的 dict 保持插入顺序），
+    查找/完成/删除都是 O(1)；mtime 校验让外部改动自动触发重新加载。
+    """
+
+    _stores: Dict[str, "_TodoStore"] = {}
+
+    def __init__(self, todo_file: Path):
+        self.todo_file = todo_file
+        self._by_id: Dict[int, Dict] = {}
+        self._mtime_ns = None
+        self._next_id = 1
+
+    @classmethod
+    def get(cls, todo_file: Path) -> "_TodoStore":
+        key = str(todo_file)
+        store = cls._stores.get(key)
+        if store is None:
+            store = cls._stores[key] = cls(todo_file)
+        return store
+
+    def _load(self):
+        try:
+            st = os.stat(self.todo_file)
+        except FileNotFoundError:
+            self._by_id = {}
+            self._mtime_ns = None
+            self._next_id = 1
+            return
+        if st.st_mtime_ns != self._mtime_ns:
+            todos = _loads(self.todo_file.read_bytes())
+            self._by_id = {todo.get("id"): todo for todo in todos}
+            self._mtime_ns = st.st_mtime_ns
+            # 只在重新加载时扫一次最大 id，之后添加条目时增量维护
+            self._next_id = max(self._by_id, default=0) + 1
+
+    def _flush(self):
+        self.todo_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = str(self.todo_file) + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_dumps(list(self._by_id.values())))
+        # 先写临时文件再原子替换，不会读到写了一半的文件
+        os.replace(tmp_path, self.todo_file)
+        self._mtime_ns = os.stat(self.todo_file).st_mtime_ns
+
+    def new_id(self) -> int:
+        self._load()
+        return self._next_id
+
+    def list_items(self) -> List[Dict]:
+        self._load()
+        # 返回浅拷贝：调用方会把条目嵌进工具结果并存入 history，
+        # 交出内部字典本身会让后续 complete 原地改写已记录的结果
+        return [dict(todo) for todo in self._by_id.values()]
+
+    def complete_item(self, item_id: int) -> bool:
+        """把条目标记为完成并落盘，条目不存在时返回 False。"""
+        self._load()
+        todo = self._by_id.get(item_id)
+        if todo is None:
+            return False
+        todo["status"] = "completed"
+        todo["completed_at"] = datetime.now().isoformat()
+        self._flush()
+        return True
+
+    def add_item(self, todo: Dict):
+        self._load()
+        self._by_id[todo["id"]] = todo
+        if todo["id"] >= self._next_id:
+            self._next_id = todo["id"] + 1
+        self._flush()
+
+    def remove_item(self, item_id: int) -> bool:
+        self._load()
+        if self._by_id.pop(item_id, None) is None:
+            return False
+        self._flush()
+        return True
+
 
 class TodoAddTool(Tool):
+    __slots__ = ("store",)
+
     def __init__(self):
         super().__init__("todo.add")
         self.schema.register_argument(
@@ -19,29 +122,15 @@ class TodoAddTool(Tool):
         )
 
     def initialize(self, env: AgentEnvironment):
-        self.todo_file = env.get_working_dir() / TODO_FILE
+        self.store = _TodoStore.get(env.get_working_dir() / TODO_FILE)
 
     def description(self) -> str:
         return "Add a new TODO item. Generate unique ID, set status to 'pending', record creation timestamp."
 
-    def _read_todos(self) -> List[Dict]:
-        """Helper function to read the todo list from JSON file."""
-        if not self.todo_file.exists():
-            return []
-        with open(self.todo_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-
-    def _write_todos(self, todos: List[Dict]):
-        """Helper function to write the todo list to JSON file."""
-        self.todo_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.todo_file, 'w', encoding='utf-8') as f:
-            json.dump(todos, f, indent=2)
-
     def execute(self, input: Dict[str, Any]) -> Dict[str, Any]:
         try:
-            todos = self._read_todos()
             # Generate a new ID by finding the max existing ID and adding 1
-            new_id = max([todo.get('id', 0) for todo in todos] + [0]) + 1
+            new_id = self.store.new_id()
             new_todo = {
                 "id": new_id,
                 "description": input["description"],
@@ -49,14 +138,15 @@ class TodoAddTool(Tool):
                 "created_at": datetime.now().isoformat(),
                 "completed_at": None,
             }
-            todos.append(new_todo)
-            self._write_todos(todos)
+            self.store.add_item(new_todo)
             return {"ok": True, "data": {"message": f"TODO item added with ID: {new_id}."}}
         except Exception as e:
             return {"ok": False, "error": f"Failed to add TODO item: {str(e)}"}
 
 
 class TodoListTool(Tool):
+    __slots__ = ("store",)
+
     def __init__(self):
         super().__init__("todo.list")
         self.schema.register_argument(
@@ -64,16 +154,10 @@ class TodoListTool(Tool):
         )
 
     def initialize(self, env: AgentEnvironment):
-        self.todo_file = env.get_working_dir() / TODO_FILE
+        self.store = _TodoStore.get(env.get_working_dir() / TODO_FILE)
 
     def description(self) -> str:
         return "List TODO items. Support optional status filter: 'pending', 'completed', or 'all' (default)."
-    
-    def _read_todos(self) -> List[Dict]:
-        if not self.todo_file.exists():
-            return []
-        with open(self.todo_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
 
     def execute(self, input: Dict[str, Any]) -> Dict[str, Any]:
         try:
@@ -82,8 +166,8 @@ class TodoListTool(Tool):
             if status_filter not in allowed_statuses:
                 return {"ok": False, "error": f"Invalid status filter. Must be one of: {allowed_statuses}"}
 
-            todos = self._read_todos()
-            
+            todos = self.store.list_items()
+
             if status_filter != "all":
                 filtered_todos = [todo for todo in todos if todo.get('status') == status_filter]
             else:
@@ -103,6 +187,8 @@ class TodoListTool(Tool):
 
 
 class TodoCompleteTool(Tool):
+    __slots__ = ("store",)
+
     def __init__(self):
         super().__init__("todo.complete")
         self.schema.register_argument(
@@ -110,44 +196,25 @@ class TodoCompleteTool(Tool):
         )
 
     def initialize(self, env: AgentEnvironment):
-        self.todo_file = env.get_working_dir() / TODO_FILE
+        self.store = _TodoStore.get(env.get_working_dir() / TODO_FILE)
 
     def description(self) -> str:
         return "Mark item as completed by ID. Update status and record completion timestamp."
 
-    def _read_todos(self) -> List[Dict]:
-        if not self.todo_file.exists():
-            return []
-        with open(self.todo_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-
-    def _write_todos(self, todos: List[Dict]):
-        self.todo_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.todo_file, 'w', encoding='utf-8') as f:
-            json.dump(todos, f, indent=2)
-
     def execute(self, input: Dict[str, Any]) -> Dict[str, Any]:
         try:
             item_id = input["id"]
-            todos = self._read_todos()
-            item_found = False
-            for todo in todos:
-                if todo.get("id") == item_id:
-                    todo["status"] = "completed"
-                    todo["completed_at"] = datetime.now().isoformat()
-                    item_found = True
-                    break
-            
-            if not item_found:
+            # 字典索引直接定位条目，不再线性扫描；改写在 store 内部完成
+            if not self.store.complete_item(item_id):
                 return {"ok": False, "error": f"TODO item with ID {item_id} not found."}
-
-            self._write_todos(todos)
             return {"ok": True, "data": {"message": f"TODO item {item_id} marked as completed."}}
         except Exception as e:
             return {"ok": False, "error": f"Failed to complete TODO item: {str(e)}"}
 
 
 class TodoRemoveTool(Tool):
+    __slots__ = ("store",)
+
     def __init__(self):
         super().__init__("todo.remove")
         self.schema.register_argument(
@@ -155,34 +222,17 @@ class TodoRemoveTool(Tool):
         )
 
     def initialize(self, env: AgentEnvironment):
-        self.todo_file = env.get_working_dir() / TODO_FILE
+        self.store = _TodoStore.get(env.get_working_dir() / TODO_FILE)
 
     def description(self) -> str:
         return "Remove a TODO item by ID."
 
-    def _read_todos(self) -> List[Dict]:
-        if not self.todo_file.exists():
-            return []
-        with open(self.todo_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-
-    def _write_todos(self, todos: List[Dict]):
-        self.todo_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.todo_file, 'w', encoding='utf-8') as f:
-            json.dump(todos, f, indent=2)
-
     def execute(self, input: Dict[str, Any]) -> Dict[str, Any]:
         try:
             item_id = input["id"]
-            todos = self._read_todos()
-            
-            initial_len = len(todos)
-            todos_after_removal = [todo for todo in todos if todo.get("id") != item_id]
-
-            if len(todos_after_removal) == initial_len:
+            # pop 一次完成查找和删除，不再重建整个列表
+            if not self.store.remove_item(item_id):
                 return {"ok": False, "error": f"TODO item with ID {item_id} not found."}
-
-            self._write_todos(todos_after_removal)
             return {"ok": True, "data": {"message": f"TODO item {item_id} removed."}}
         except Exception as e:
             return {"ok": False, "error": f"Failed to remove TODO item: {str(e)}"}